@@ -1,164 +1,645 @@
-from numba import njit,  float64, int64
+from numba import njit, prange, get_num_threads,  float32, float64, int64, boolean
 from numba.experimental import jitclass
 import numpy as np
 
 
 @njit
-def min_along_axis0(arr):
-    out = arr[0].copy()
-    for i in range(arr.shape[0]):
-        for j in range(arr.shape[1]):
-            if arr[i, j] < out[j]:
-                out[j] = arr[i, j]
-    return out
+def min_max_along_axis0(arr):
+    """Column-wise (min, max) of an (n, 3) array in a single pass."""
+    lo0, lo1, lo2 = arr[0, 0], arr[0, 1], arr[0, 2]
+    hi0, hi1, hi2 = lo0, lo1, lo2
+    for i in range(1, arr.shape[0]):
+        x, y, z = arr[i, 0], arr[i, 1], arr[i, 2]
+        lo0 = min(lo0, x)
+        hi0 = max(hi0, x)
+        lo1 = min(lo1, y)
+        hi1 = max(hi1, y)
+        lo2 = min(lo2, z)
+        hi2 = max(hi2, z)
+    return np.array([lo0, lo1, lo2]), np.array([hi0, hi1, hi2])
 
 @njit
-def max_along_axis0(arr):
-    out = arr[0].copy()
-    for i in range(arr.shape[0]):
-        for j in range(arr.shape[1]):
-            if arr[i, j] > out[j]:
-                out[j] = arr[i, j]
+def _spread_bits(n, n_bits, bit_pos):
+    """Lookup table moving bit l of each value in [0, n) to bit bit_pos[l] of the output."""
+    out = np.zeros(n, dtype=np.int64)
+    for v in range(n):
+        code = 0
+        for l in range(n_bits):
+            code |= ((v >> l) & 1) << bit_pos[l]
+        out[v] = code
     return out
 
+@njit
+def _morton_luts(bin_shape):
+    """Per-axis tables for Morton (Z-order) bin codes, plus the number of codes.
+
+    The code of bin (ix, iy, iz) is morton_x[ix] | morton_y[iy] | morton_z[iz]: bits are
+    interleaved level by level (z lowest), and an axis drops out of the interleave once
+    its bits run out, so the code range stays below 8 * nx * ny * nz even for very
+    flat grids. Bins that are close in 3D get codes that are close, so their points
+    sit close together in px/py/pz.
+    """
+    n_bits = np.zeros(3, dtype=np.int64)
+    for a in range(3):
+        while (1 << n_bits[a]) < bin_shape[a]:
+            n_bits[a] += 1
+
+    bit_pos = np.zeros((3, 64), dtype=np.int64)
+    pos = 0
+    for l in range(n_bits.max()):
+        for a in (2, 1, 0):
+            if l < n_bits[a]:
+                bit_pos[a, l] = pos
+                pos += 1
+
+    morton_x = _spread_bits(bin_shape[0], n_bits[0], bit_pos[0])
+    morton_y = _spread_bits(bin_shape[1], n_bits[1], bit_pos[1])
+    morton_z = _spread_bits(bin_shape[2], n_bits[2], bit_pos[2])
+    return morton_x, morton_y, morton_z, 1 << pos
+
+@njit
+def _compute_keys(points, origin, bin_widths, morton_x, morton_y, morton_z, out_keys):
+    """Writes each point's Morton bin code to out_keys in one pass."""
+    for i in range(points.shape[0]):
+        kx = np.int64(np.floor((points[i, 0] - origin[0]) / bin_widths[0]))
+        ky = np.int64(np.floor((points[i, 1] - origin[1]) / bin_widths[1]))
+        kz = np.int64(np.floor((points[i, 2] - origin[2]) / bin_widths[2]))
+        out_keys[i] = morton_x[kx] | morton_y[ky] | morton_z[kz]
+
+@njit
+def _counting_sort(points, keys, n_bins):
+    """Bucket-sort points by bin key in O(n + n_bins).
+
+    Returns the CSR offsets (length n_bins + 1), the sorted x/y/z arrays and the
+    original index of each sorted point. Points keep their input order within a bin.
+    """
+    n_points = points.shape[0]
+
+    # Pass 1: histogram, shifted by one so the prefix sum is the bin start offsets
+    bin_start = np.zeros(n_bins + 1, dtype=np.int64)
+    for i in range(n_points):
+        bin_start[keys[i] + 1] += 1
+    for b in range(n_bins):
+        bin_start[b + 1] += bin_start[b]
+
+    # Pass 2: scatter each point into the next free slot of its bin
+    pos = bin_start[:-1].copy()
+    px = np.empty(n_points, dtype=np.float64)
+    py = np.empty(n_points, dtype=np.float64)
+    pz = np.empty(n_points, dtype=np.float64)
+    order = np.empty(n_points, dtype=np.int64)
+    for i in range(n_points):
+        d = pos[keys[i]]
+        px[d] = points[i, 0]
+        py[d] = points[i, 1]
+        pz[d] = points[i, 2]
+        order[d] = i
+        pos[keys[i]] += 1
+    return bin_start, px, py, pz, order
+
+@njit(inline='always')
+def _dist_sq3(x, y, z, qx, qy, qz):
+    """Squared 3D distance, written out per axis so it compiles to three multiply-adds with no loop.
+
+    Every distance test goes through here: the tile kernel, the scalar tail of _scan_bin
+    and the per-bin rejection.
+    """
+    dx = x - qx
+    dy = y - qy
+    dz = z - qz
+    return dx * dx + dy * dy + dz * dz
+
+# Width of the distance tiles in _block_dist_sqr (8 float64 lanes = one AVX-512 register)
+BLOCK_WIDTH = 8
+
+# Smallest bin box (in bins) that radius_search splits across threads; below it the
+# thread launch and scratch buffers cost more than they save, so the box is swept serially
+PARALLEL_MIN_BINS = 100
+
+# radius_search_many: most queries per task (each task reuses one distance scratch buffer), and
+# most hit-segment entries held in scratch at once (64 MB of int64; bounds the scratch memory)
+QUERY_CHUNK = 64
+QUERY_SCRATCH_LEN = 1 << 23
+
+@njit(fastmath=True, boundscheck=False)
+def _block_dist_sqr(px, py, pz, start, end, qx, qy, qz, out_d):
+    """Squared distances from (qx, qy, qz) to the full tiles of points start..end.
+
+    Subtracts before squaring, so the result stays accurate however far the cloud
+    is from zero. Results go to out_d[0:tiles_end - start]; returns tiles_end, the
+    first point of the partial tile left to the caller.
+    """
+    # Full tiles: the fixed-width inner loop unrolls into independent lanes
+    tiles_end = start + ((end - start) // BLOCK_WIDTH) * BLOCK_WIDTH
+    for b in range(start, tiles_end, BLOCK_WIDTH):
+        for k in range(BLOCK_WIDTH):
+            i = b + k
+            out_d[i - start] = _dist_sq3(px[i], py[i], pz[i], qx, qy, qz)
+    return tiles_end
+
+@njit(inline='always')
+def _bin_out_of_reach(cx, cy, cz, qx, qy, qz, reach_sq):
+    """True if the bin centered at (cx, cy, cz) cannot intersect the query sphere.
+
+    reach_sq is (radius + bin half-diagonal)^2: any bin whose center is farther
+    than that from the query lies entirely outside the sphere.
+    """
+    return _dist_sq3(cx, cy, cz, qx, qy, qz) > reach_sq
+
+@njit(inline='always')
+def _bin_box(qx, qy, qz, radius, origin, bin_widths, bin_shape):
+    """Bin index box (lo0, lo1, lo2, hi0, hi1, hi2) of the query sphere, clamped to the grid."""
+    ox, oy, oz = origin[0], origin[1], origin[2]
+    bwx, bwy, bwz = bin_widths[0], bin_widths[1], bin_widths[2]
+    lo0 = max(np.int64(np.floor((qx - radius - ox) / bwx)), 0)
+    lo1 = max(np.int64(np.floor((qy - radius - oy) / bwy)), 0)
+    lo2 = max(np.int64(np.floor((qz - radius - oz) / bwz)), 0)
+    hi0 = min(np.int64(np.floor((qx + radius - ox) / bwx)), bin_shape[0] - 1)
+    hi1 = min(np.int64(np.floor((qy + radius - oy) / bwy)), bin_shape[1] - 1)
+    hi2 = min(np.int64(np.floor((qz + radius - oz) / bwz)), bin_shape[2] - 1)
+    return lo0, lo1, lo2, hi0, hi1, hi2
+
+@njit(inline='always')
+def _box_count(bin_start, morton_x, morton_y, morton_z, lo0, lo1, lo2, hi0, hi1, hi2):
+    """Number of points, live or removed, in the bins of the box [lo, hi]."""
+    count = 0
+    for ix in range(lo0, hi0 + 1):
+        code_x = morton_x[ix]
+        for iy in range(lo1, hi1 + 1):
+            code_xy = code_x | morton_y[iy]
+            for iz in range(lo2, hi2 + 1):
+                flat_b = code_xy | morton_z[iz]
+                count += bin_start[flat_b + 1] - bin_start[flat_b]
+    return count
+
+@njit(inline='always')
+def _scan_bin(px, py, pz, bin_start, visited_gen, current_gen, flat_b,
+              qx, qy, qz, radius_sq,
+              tmp_d, original_indices, found_indices, found, remove):
+    """Collects the live points of one bin within the radius; returns the new found count.
+
+    If remove, the hits are also marked as removed. This is the single per-point test
+    behind radius_search and radius_search_many, so both classify every point alike.
+    """
+    start = bin_start[flat_b]
+    end = bin_start[flat_b + 1]
+    if start == end:
+        return found
+
+    # Squared distances for the full tiles of this bin's contiguous run of points
+    tiles_end = _block_dist_sqr(px, py, pz, start, end, qx, qy, qz, tmp_d)
+
+    # Branchless compaction: always write the candidate, only advance on a hit
+    for k in range(tiles_end - start):
+        i = start + k # i is the NEW, sorted index
+        hit = (tmp_d[k] <= radius_sq) & (visited_gen[i] != current_gen)
+        found_indices[found] = original_indices[i] # Store the ORIGINAL index
+        found += hit
+        if remove:
+            # visited_gen never exceeds current_gen, so this stamps exactly the hits
+            visited_gen[i] = max(visited_gen[i], hit * current_gen) # Removed points are skipped by later searches
+
+    # Scalar tail (and bins smaller than a tile): the same distance as the tiles, so a
+    # boundary point is classified the same wherever it sits in its bin. The per-axis
+    # early exits only test prefixes of that sum, which can only grow, so they never
+    # reject a point the full test would accept.
+    for i in range(tiles_end, end):
+        if visited_gen[i] == current_gen:
+            continue
+        dx = px[i] - qx
+        dx2 = dx * dx
+        if dx2 > radius_sq:
+            continue
+        dy = py[i] - qy
+        if dx2 + dy * dy > radius_sq:
+            continue
+        if _dist_sq3(px[i], py[i], pz[i], qx, qy, qz) <= radius_sq:
+            if remove:
+                visited_gen[i] = current_gen
+            found_indices[found] = original_indices[i]
+            found += 1
+    return found
+
+@njit(inline='always')
+def _sweep_bins(px, py, pz, bin_start, visited_gen, current_gen,
+                morton_x, morton_y, morton_z,
+                origin, bin_widths, box, span, qx, qy, qz, reach_sq,
+                kx, ky, kz, radius_sq,
+                tmp_d, original_indices, found_indices, found, remove):
+    """Scans the bins of box, span bins per axis at most; returns the new found count.
+
+    span only sets the trip counts: the loops stop at the box's upper bounds, so a
+    constant span such as (3, 3, 3) lets the compiler fully unroll a small sweep.
+    """
+    # Grid geometry as local scalars, so the bin loops below never touch the arrays
+    ox, oy, oz = origin[0], origin[1], origin[2]
+    bwx, bwy, bwz = bin_widths[0], bin_widths[1], bin_widths[2]
+    lo0, lo1, lo2, hi0, hi1, hi2 = box
+    for d0 in range(span[0]):
+        ix = lo0 + d0
+        if ix > hi0:
+            break
+        # Morton bin code and bin center, with the per-axis parts hoisted per loop level
+        code_x = morton_x[ix]
+        cx = ox + (ix + 0.5) * bwx
+        for d1 in range(span[1]):
+            iy = lo1 + d1
+            if iy > hi1:
+                break
+            code_xy = code_x | morton_y[iy]
+            cy = oy + (iy + 0.5) * bwy
+            for d2 in range(span[2]):
+                iz = lo2 + d2
+                if iz > hi2:
+                    break
+                # Skip corner bins that the sphere cannot reach
+                if _bin_out_of_reach(cx, cy, oz + (iz + 0.5) * bwz, qx, qy, qz, reach_sq):
+                    continue
+                flat_b = code_xy | morton_z[iz]
+                found = _scan_bin(px, py, pz, bin_start, visited_gen, current_gen, flat_b,
+                                  kx, ky, kz, radius_sq,
+                                  tmp_d, original_indices, found_indices, found, remove)
+    return found
+
+@njit(parallel=True, fastmath=True, boundscheck=False)
+def _search_general_parallel(px, py, pz, bin_start, visited_gen, current_gen,
+                             morton_x, morton_y, morton_z,
+                             origin, bin_widths, box, qx, qy, qz, reach_sq,
+                             kx, ky, kz, radius_sq,
+                             tmp_d, original_indices, found_indices, found):
+    """Scans the bin box with one task per ix slab; returns the new found count.
+
+    Every point belongs to exactly one bin and every bin to exactly one slab, so the
+    slabs touch disjoint parts of visited_gen. Each slab collects its hits into its own
+    segment of a scratch buffer, and the segments are appended to found_indices
+    in ix order afterwards.
+
+    (qx, qy, qz) is the query in world coordinates, for the bin geometry; (kx, ky, kz)
+    and radius_sq are in the frame and precision of px/py/pz. tmp_d is only a template:
+    each slab gets its own distance buffer of the same size and dtype.
+    """
+    lo0, lo1, lo2, hi0, hi1, hi2 = box
+    n_slabs = hi0 - lo0 + 1
+    if n_slabs <= 0 or lo1 > hi1 or lo2 > hi2:
+        return found
+
+    # Slab capacity = points in its (iy, iz) window, plus the spare slot _scan_bin writes past the last hit
+    slab_offsets = np.zeros(n_slabs + 1, dtype=np.int64)
+    for s in prange(n_slabs):
+        ix = lo0 + s
+        slab_offsets[s + 1] = 1 + _box_count(bin_start, morton_x, morton_y, morton_z, ix, lo1, lo2, ix, hi1, hi2)
+    for s in range(n_slabs):
+        slab_offsets[s + 1] += slab_offsets[s]
+
+    scratch = np.empty(slab_offsets[n_slabs], dtype=np.int64)
+    slab_found = np.zeros(n_slabs, dtype=np.int64)
+    for s in prange(n_slabs):
+        ix = lo0 + s
+        slab_d = np.empty_like(tmp_d)
+        segment = scratch[slab_offsets[s]:slab_offsets[s + 1]]
+        slab_found[s] = _sweep_bins(px, py, pz, bin_start, visited_gen, current_gen,
+                                    morton_x, morton_y, morton_z,
+                                    origin, bin_widths, (ix, lo1, lo2, ix, hi1, hi2),
+                                    (1, hi1 - lo1 + 1, hi2 - lo2 + 1), qx, qy, qz, reach_sq,
+                                    kx, ky, kz, radius_sq,
+                                    slab_d, original_indices, segment, 0, True)
+
+    # Serial merge of the per-slab hits
+    for s in range(n_slabs):
+        for k in range(slab_found[s]):
+            found_indices[found] = scratch[slab_offsets[s] + k]
+            found += 1
+    return found
+
+@njit(inline='always')
+def _search_serial(px, py, pz, bin_start, visited_gen, current_gen,
+                   morton_x, morton_y, morton_z,
+                   origin, bin_widths, box, qx, qy, qz, reach_sq,
+                   kx, ky, kz, radius_sq,
+                   tmp_d, original_indices, found_indices, found, remove):
+    """Scans a bin box on the calling thread, fully unrolled when it is at most 3x3x3."""
+    lo0, lo1, lo2, hi0, hi1, hi2 = box
+    # Decide on the box itself: floor rounding can stretch even a radius of one bin width over 4 bins
+    if hi0 - lo0 <= 2 and hi1 - lo1 <= 2 and hi2 - lo2 <= 2:
+        # Constant trip counts let the compiler fully unroll the 27-bin sweep
+        return _sweep_bins(px, py, pz, bin_start, visited_gen, current_gen,
+                           morton_x, morton_y, morton_z,
+                           origin, bin_widths, box, (3, 3, 3), qx, qy, qz, reach_sq,
+                           kx, ky, kz, radius_sq,
+                           tmp_d, original_indices, found_indices, found, remove)
+    span = (hi0 - lo0 + 1, hi1 - lo1 + 1, hi2 - lo2 + 1)
+    return _sweep_bins(px, py, pz, bin_start, visited_gen, current_gen,
+                       morton_x, morton_y, morton_z,
+                       origin, bin_widths, box, span, qx, qy, qz, reach_sq,
+                       kx, ky, kz, radius_sq,
+                       tmp_d, original_indices, found_indices, found, remove)
+
+@njit(inline='always')
+def _search_bins(px, py, pz, bin_start, visited_gen, current_gen,
+                 bin_shape, morton_x, morton_y, morton_z,
+                 origin, bin_widths, bin_half_diag, qx, qy, qz, radius,
+                 kx, ky, kz, radius_sq,
+                 tmp_d, original_indices, found_indices, found):
+    """Picks the bins the query sphere can reach and scans them; returns the new found count.
+
+    The bin geometry uses the world-space query (qx, qy, qz) and radius; the distance
+    kernels use (kx, ky, kz) and radius_sq, in the frame and precision of px/py/pz.
+    """
+    box = _bin_box(qx, qy, qz, radius, origin, bin_widths, bin_shape)
+    lo0, lo1, lo2, hi0, hi1, hi2 = box
+    reach = radius + bin_half_diag
+    reach_sq = reach * reach
+
+    # Boxes below PARALLEL_MIN_BINS are cheaper to sweep on this thread
+    if (hi0 - lo0 + 1) * (hi1 - lo1 + 1) * (hi2 - lo2 + 1) < PARALLEL_MIN_BINS:
+        return _search_serial(px, py, pz, bin_start, visited_gen, current_gen,
+                              morton_x, morton_y, morton_z,
+                              origin, bin_widths, box, qx, qy, qz, reach_sq,
+                              kx, ky, kz, radius_sq,
+                              tmp_d, original_indices, found_indices, found, True)
+    return _search_general_parallel(px, py, pz, bin_start, visited_gen, current_gen,
+                                    morton_x, morton_y, morton_z,
+                                    origin, bin_widths, box, qx, qy, qz, reach_sq,
+                                    kx, ky, kz, radius_sq,
+                                    tmp_d, original_indices, found_indices, found)
+
+@njit(cache=True, fastmath=True, boundscheck=False)
+def _radius_search(px, py, pz, bin_start, visited_gen, current_gen,
+                   bin_shape, morton_x, morton_y, morton_z, origin, bin_widths, bin_half_diag,
+                   qx, qy, qz, radius, tmp_d, original_indices, found_indices, found):
+    """Finds and removes the live points within radius of (qx, qy, qz); returns the new found count.
+
+    Hits are appended to found_indices (as original indices) starting at position found.
+    """
+    radius_sq = radius * radius
+    return _search_bins(px, py, pz, bin_start, visited_gen, current_gen,
+                        bin_shape, morton_x, morton_y, morton_z,
+                        origin, bin_widths, bin_half_diag, qx, qy, qz, radius,
+                        qx, qy, qz, radius_sq,
+                        tmp_d, original_indices, found_indices, found)
+
+@njit(cache=True, fastmath=True, boundscheck=False)
+def _radius_search_f32(px, py, pz, bin_start, visited_gen, current_gen,
+                       bin_shape, morton_x, morton_y, morton_z, origin, bin_widths, bin_half_diag,
+                       qx, qy, qz, radius, tmp_d, original_indices, found_indices, found):
+    """float32 twin of _radius_search, for px/py/pz stored as float32 relative to origin.
+
+    The query is moved into the same origin-relative frame and every kernel constant is
+    rounded to float32, so the distance tests run entirely in single precision.
+    """
+    kx = np.float32(qx - origin[0])
+    ky = np.float32(qy - origin[1])
+    kz = np.float32(qz - origin[2])
+    radius_sq = np.float32(radius) * np.float32(radius)
+    return _search_bins(px, py, pz, bin_start, visited_gen, current_gen,
+                        bin_shape, morton_x, morton_y, morton_z,
+                        origin, bin_widths, bin_half_diag, qx, qy, qz, radius,
+                        kx, ky, kz, radius_sq,
+                        tmp_d, original_indices, found_indices, found)
+
+@njit(parallel=True, nogil=True, fastmath=True, boundscheck=False)
+def _radius_search_many(px, py, pz, bin_start, visited_gen, current_gen, bin_shape, morton_x, morton_y, morton_z,
+                        origin, bin_widths, bin_half_diag, tmp_d, original_indices,
+                        queries, radii, local_queries, radii_sq):
+    """Runs one read-only radius query per row of queries, in parallel.
+
+    Returns (offsets, indices) in CSR form: the original indices found for query q
+    are indices[offsets[q]:offsets[q + 1]]. As in radius_search, the bin geometry uses
+    the world-space queries and radii, and the point tests use local_queries and
+    radii_sq, in the frame and precision of px/py/pz; tmp_d is the template for the
+    per-task distance buffers.
+
+    Each query gets a scratch segment sized from the bin counts of its box, so its
+    points are scanned once. Queries run in consecutive batches whose segments add up
+    to at most QUERY_SCRATCH_LEN entries (a query whose box alone is larger runs on
+    its own), and each batch's hits are then packed into indices.
+    """
+    n_queries = queries.shape[0]
+
+    # Segment length = points in the query's bin box, plus the spare slot _scan_bin writes past the last hit
+    seg_len = np.empty(n_queries, dtype=np.int64)
+    for q in prange(n_queries):
+        lo0, lo1, lo2, hi0, hi1, hi2 = _bin_box(queries[q, 0], queries[q, 1], queries[q, 2], radii[q],
+                                                origin, bin_widths, bin_shape)
+        seg_len[q] = 1 + _box_count(bin_start, morton_x, morton_y, morton_z, lo0, lo1, lo2, hi0, hi1, hi2)
+
+    offsets = np.zeros(n_queries + 1, dtype=np.int64)
+    indices = np.empty(0, dtype=np.int64)
+    b0 = 0
+    while b0 < n_queries:
+        # Grow the batch while its segments fit in QUERY_SCRATCH_LEN; it always takes at least one query
+        nb = 1
+        total = seg_len[b0]
+        while b0 + nb < n_queries and total + seg_len[b0 + nb] <= QUERY_SCRATCH_LEN:
+            total += seg_len[b0 + nb]
+            nb += 1
+        seg_offsets = np.zeros(nb + 1, dtype=np.int64)
+        for j in range(nb):
+            seg_offsets[j + 1] = seg_offsets[j] + seg_len[b0 + j]
+
+        scratch = np.empty(total, dtype=np.int64)
+        counts = np.zeros(nb, dtype=np.int64)
+        # Up to QUERY_CHUNK queries per task, but a few tasks per thread even in small batches
+        chunk = max(1, min(QUERY_CHUNK, nb // (4 * get_num_threads())))
+        n_chunks = (nb + chunk - 1) // chunk
+        for c in prange(n_chunks):
+            chunk_d = np.empty_like(tmp_d)
+            for j in range(c * chunk, min((c + 1) * chunk, nb)):
+                q = b0 + j
+                qx, qy, qz = queries[q, 0], queries[q, 1], queries[q, 2]
+                box = _bin_box(qx, qy, qz, radii[q], origin, bin_widths, bin_shape)
+                reach = radii[q] + bin_half_diag
+                counts[j] = _search_serial(px, py, pz, bin_start, visited_gen, current_gen,
+                                           morton_x, morton_y, morton_z,
+                                           origin, bin_widths, box, qx, qy, qz, reach * reach,
+                                           local_queries[q, 0], local_queries[q, 1], local_queries[q, 2], radii_sq[q],
+                                           chunk_d, original_indices, scratch[seg_offsets[j]:seg_offsets[j + 1]], 0,
+                                           False)
+
+        # Append the batch's hits, growing indices geometrically
+        for j in range(nb):
+            offsets[b0 + j + 1] = offsets[b0 + j] + counts[j]
+        if offsets[b0 + nb] > indices.shape[0]:
+            grown = np.empty(max(offsets[b0 + nb], 2 * indices.shape[0]), dtype=np.int64)
+            for k in range(offsets[b0]):
+                grown[k] = indices[k]
+            indices = grown
+        for j in prange(nb):
+            for k in range(counts[j]):
+                indices[offsets[b0 + j] + k] = scratch[seg_offsets[j] + k]
+        b0 += nb
+    return offsets, indices[:offsets[n_queries]]
+
 
 spec = [
     # New: The original data, for reference/resetting the structure
-    ('original_points', float64[:, :]),
-    # New: The cache-friendly, bin-sorted copy of points
-    ('points', float64[:, :]),
-    ('bin_widths', float64[:]),
-    ('origin', float64[:]),
+    ('original_points', float64[:, ::1]),
+    # New: The cache-friendly, bin-sorted copy of points, one contiguous array per axis (SoA)
+    ('px', float64[::1]),
+    ('py', float64[::1]),
+    ('pz', float64[::1]),
+    # float32 mode: px/py/pz are left empty and these hold the points instead, relative
+    # to origin, so each coordinate is rounded relative to the cloud's extent, not its position
+    ('use_f32', boolean),
+    ('px32', float32[::1]),
+    ('py32', float32[::1]),
+    ('pz32', float32[::1]),
+    ('bin_widths', float64[::1]),
+    ('origin', float64[::1]),
     # New: Maps the index in 'points' back to the index in 'original_points'
-    ('original_indices', int64[:]),
-    ('bin_indices', int64[:, :]),
-    ('bin_shape', int64[:]),
-    ('first_member', int64[:, :, :]),
-    ('next_member', int64[:]),
-    ('original_first_member', int64[:, :, :]),
-    ('original_next_member', int64[:]),
-    ('original_next_member_copy', int64[:]), # Used for reset
-    ('_found_indices', int64[:]),
+    ('original_indices', int64[::1]),
+    ('bin_shape', int64[::1]),
+    # Per-axis Morton tables: bin (ix, iy, iz) has code morton_x[ix] | morton_y[iy] | morton_z[iz]
+    ('morton_x', int64[::1]),
+    ('morton_y', int64[::1]),
+    ('morton_z', int64[::1]),
+    # Half the diagonal of one bin, for the per-bin bounding-sphere rejection
+    ('bin_half_diag', float64),
+    # CSR bin index: points of the bin with Morton code b live at px/py/pz[bin_start[b]:bin_start[b + 1]]
+    ('bin_start', int64[::1]),
+    # A point is found (removed) iff visited_gen[i] == current_gen; reset() just bumps current_gen
+    ('visited_gen', int64[::1]),
+    ('current_gen', int64),
+    # Scratch buffer for one bin's squared distances (sized to the fullest bin), in the
+    # precision of the stored points: _tmp_d32 in float32 mode, _tmp_d otherwise (the other is empty)
+    ('_tmp_d', float64[::1]),
+    ('_tmp_d32', float32[::1]),
+    ('_found_indices', int64[::1]),
     ('found_count', int64),
 ]
 
 @jitclass(spec)
 class PointBin3D_JIT:
-    def __init__(self, original_points, bin_widths):
+    def __init__(self, original_points, bin_widths, use_f32=False):
+        # Every array on the class is C-contiguous; strided inputs are copied once here
+        original_points = np.ascontiguousarray(original_points)
+        bin_widths = np.ascontiguousarray(bin_widths)
         self.original_points = original_points
         self.bin_widths = bin_widths
-        self.origin = min_along_axis0(original_points)
+        self.origin, max_corner = min_max_along_axis0(original_points)
         n_points = original_points.shape[0]
 
-        # 1. Compute bin indices
-        self.bin_indices = np.floor((original_points - self.origin) / bin_widths).astype(np.int64)
-        self.bin_shape = max_along_axis0(self.bin_indices) + 1
-        size_tuple = (int(self.bin_shape[0]), int(self.bin_shape[1]), int(self.bin_shape[2]))
+        # 1. Compute the bin grid
+        # The largest bin index per axis is the bin of the max corner (floor is monotonic)
+        self.bin_shape = np.floor((max_corner - self.origin) / bin_widths).astype(np.int64) + 1
+        self.morton_x, self.morton_y, self.morton_z, n_bins = _morton_luts(self.bin_shape)
+        # Padded slightly so rounding never rejects a bin whose corner just touches the sphere
+        self.bin_half_diag = 0.5 * np.sqrt((bin_widths * bin_widths).sum()) * (1.0 + 1e-6)
 
         # 2. Sort/Reorder Data (The Cache Boost)
-        # Create a combined key for stable sorting by bin indices (ix, iy, iz)
-        # This determines the final contiguous order.
-        keys = (self.bin_indices[:, 0] * self.bin_shape[1] * self.bin_shape[2] +
-                self.bin_indices[:, 1] * self.bin_shape[2] +
-                self.bin_indices[:, 2])
-
-        # Get the new sorted order (indices into original_points)
-        sort_order = np.argsort(keys)
-
-        # Create the cache-friendly, sorted points and original index map
-        self.points = original_points[sort_order].copy()
-        self.original_indices = sort_order.copy()
-
-        # Now, bin_indices needs to refer to the NEW (sorted) index
-        # This is essentially the same as doing: self.bin_indices = self.bin_indices[sort_order]
-        # But we don't strictly need to update self.bin_indices if we rebuild pointers
-
-        # 3. Initialize/Build Linked Lists (using NEW indices 0 to N-1)
-        self.first_member = np.full(size_tuple, -1, dtype=np.int64)
-        self.next_member = np.full(n_points, -1, dtype=np.int64)
-
-        # Iterate over the NEW sorted indices (i_sorted)
-        for i_sorted in range(n_points):
-            # i_sorted is the new index.
-            # We look up the original index to find its bin coords.
-            i_original = sort_order[i_sorted]
-            ix, iy, iz = self.bin_indices[i_original]
-
-            # The linked list connects the NEW indices.
-            self.next_member[i_sorted] = self.first_member[ix, iy, iz]
-            self.first_member[ix, iy, iz] = i_sorted
-
-        # Store originals for reset
-        self.original_first_member = self.first_member.copy()
-        self.original_next_member = self.next_member.copy()
-        # Numba requires a direct copy assignment for reset function
-        self.original_next_member_copy = self.original_next_member.copy()
+        # Create a combined key for sorting by bin indices (ix, iy, iz)
+        # This determines the final contiguous order. The key is the bin's Morton code,
+        # so neighbouring bins (in all three axes) mostly end up near each other in memory.
+        # The per-point bin indices are folded straight into the key, so no (n, 3)
+        # index array is materialized.
+        keys = np.empty(n_points, dtype=np.int64)
+        _compute_keys(original_points, self.origin, bin_widths,
+                      self.morton_x, self.morton_y, self.morton_z, keys)
+
+        # 3. Counting sort straight into the cache-friendly layout (using NEW indices 0 to N-1):
+        # CSR offsets, sorted points (one unit-stride array per axis) and the original index map.
+        # Points are bin-sorted, so each bin is one contiguous run of px/py/pz
+        self.bin_start, px, py, pz, self.original_indices = _counting_sort(
+            original_points, keys, n_bins)
+
+        # 4. Store the points in the precision the distance kernels will run in
+        self.use_f32 = use_f32
+        if use_f32:
+            # Half the bytes per point and twice the SIMD lanes; the API stays float64
+            self.px32 = (px - self.origin[0]).astype(np.float32)
+            self.py32 = (py - self.origin[1]).astype(np.float32)
+            self.pz32 = (pz - self.origin[2]).astype(np.float32)
+            self.px = np.empty(0, dtype=np.float64)
+            self.py = np.empty(0, dtype=np.float64)
+            self.pz = np.empty(0, dtype=np.float64)
+        else:
+            self.px = px
+            self.py = py
+            self.pz = pz
+            self.px32 = np.empty(0, dtype=np.float32)
+            self.py32 = np.empty(0, dtype=np.float32)
+            self.pz32 = np.empty(0, dtype=np.float32)
+        self.visited_gen = np.zeros(n_points, dtype=np.int64)
+        self.current_gen = 1
+        max_count = max((self.bin_start[1:] - self.bin_start[:-1]).max(), 1)
+        if use_f32:
+            self._tmp_d = np.empty(0, dtype=np.float64)
+            self._tmp_d32 = np.empty(max_count, dtype=np.float32)
+        else:
+            self._tmp_d = np.empty(max_count, dtype=np.float64)
+            self._tmp_d32 = np.empty(0, dtype=np.float32)
 
         # Running list of found indices
-        # We store the *new, sorted* indices first, then map to original indices on output
-        self._found_indices = np.full(n_points, -1, dtype=np.int64)
+        # The kernels store the *original* indices directly, so found_indices() needs no remapping
+        # One spare slot: the branchless compaction writes one entry past the last hit
+        self._found_indices = np.full(n_points + 1, -1, dtype=np.int64)
         self.found_count = 0
 
     def radius_search(self, query_point, radius):
-        # Compute the bounding box in bin coordinates (using original_points.shape[1] dimensions)
-        min_corner = query_point - radius
-        max_corner = query_point + radius
-
-        # Use np.int64 for consistency
-        min_bin = np.floor((min_corner - self.origin) / self.bin_widths).astype(np.int64)
-        max_bin = np.floor((max_corner - self.origin) / self.bin_widths).astype(np.int64)
-
-        # Clamp bin indices to valid range (Vectorized)
-        min_bin = np.maximum(min_bin, 0)
-        max_bin = np.minimum(max_bin, self.bin_shape - 1)
-
-        radius_sq = radius ** 2
-
-        # Iterate over all bins that may intersect the search sphere
-        for ix in range(min_bin[0], max_bin[0] + 1):
-            for iy in range(min_bin[1], max_bin[1] + 1):
-                for iz in range(min_bin[2], max_bin[2] + 1):
-                    prev = -1
-                    i = self.first_member[ix, iy, iz] # i is the NEW, sorted index
-
-                    # Traverse the linked list for this bin
-                    while i != -1:
-                        next_i = self.next_member[i]
-
-                        # p% VECTORIZED DISTANCE CHECK (Accessing contiguous memory)
-                        diff = self.points[i] - query_point
-                        d = np.sum(diff * diff)
-
-                        if d <= radius_sq:
-                            # Point is found and is in the cache-friendly 'points' array
-
-                            # Remove from linked list
-                            if prev == -1:
-                                self.first_member[ix, iy, iz] = next_i
-                            else:
-                                self.next_member[prev] = next_i
-
-                            self.next_member[i] = -2 # Use -2 as a clear 'removed' marker (or use a separate array as discussed)
-                            self._found_indices[self.found_count] = i # Store the NEW index
-                            self.found_count += 1
-                            # prev does not advance
-                        else:
-                            prev = i
-                        i = next_i
+        # The kernel is a free function over the contiguous arrays; this is just the dispatch
+        if self.use_f32:
+            self.found_count = _radius_search_f32(
+                self.px32, self.py32, self.pz32, self.bin_start, self.visited_gen,
+                self.current_gen, self.bin_shape, self.morton_x, self.morton_y, self.morton_z,
+                self.origin, self.bin_widths, self.bin_half_diag,
+                query_point[0], query_point[1], query_point[2], radius,
+                self._tmp_d32, self.original_indices, self._found_indices, self.found_count)
+            return
+        self.found_count = _radius_search(
+            self.px, self.py, self.pz, self.bin_start, self.visited_gen, self.current_gen,
+            self.bin_shape, self.morton_x, self.morton_y, self.morton_z,
+            self.origin, self.bin_widths, self.bin_half_diag,
+            query_point[0], query_point[1], query_point[2], radius,
+            self._tmp_d, self.original_indices, self._found_indices, self.found_count)
+
+    def radius_search_many(self, queries, radii):
+        """Radius searches for many (n, 3) query points at once, without removing any points.
+
+        Points already removed by radius_search are skipped. Returns (offsets, indices):
+        the original indices found for query q are indices[offsets[q]:offsets[q + 1]].
+        """
+        # ndim is known at compile time, so numba prunes the other branch and wrong ranks
+        # raise here instead of failing to type the kernel call (pruning needs queries unrebound)
+        if queries.ndim != 2:
+            raise ValueError("queries must have shape (n, 3)")
+        if queries.shape[1] != 3:
+            raise ValueError("queries must have shape (n, 3)")
+        if queries.shape[0] != radii.shape[0]:
+            raise ValueError("queries and radii must have the same length")
+        query_points = np.ascontiguousarray(queries)
+        radii = np.ascontiguousarray(radii)
+        if self.use_f32:
+            # Same float32 query frame and constants as _radius_search_f32
+            radii32 = radii.astype(np.float32)
+            return _radius_search_many(
+                self.px32, self.py32, self.pz32, self.bin_start, self.visited_gen, self.current_gen,
+                self.bin_shape, self.morton_x, self.morton_y, self.morton_z,
+                self.origin, self.bin_widths, self.bin_half_diag, self._tmp_d32, self.original_indices,
+                query_points, radii, (query_points - self.origin).astype(np.float32), radii32 * radii32)
+        return _radius_search_many(
+            self.px, self.py, self.pz, self.bin_start, self.visited_gen, self.current_gen,
+            self.bin_shape, self.morton_x, self.morton_y, self.morton_z,
+            self.origin, self.bin_widths, self.bin_half_diag, self._tmp_d, self.original_indices,
+            query_points, radii, query_points, radii * radii)
 
     def found_indices(self):
-        """Returns the original indices of points found within the radius."""
-        # Maps the NEW (sorted) indices to the ORIGINAL indices before returning
-        found_sorted_indices = self._found_indices[:self.found_count]
-        return self.original_indices[found_sorted_indices].copy()
+        """Returns the original indices of points found within the radius.
+
+        This is a view into the internal buffer, valid until the next reset(); copy it to keep it.
+        """
+        return self._found_indices[:self.found_count]
 
     def reset(self):
         """Restores the structure for a fresh search on all points."""
-        self.first_member[:, :, :] = self.original_first_member
-        # Use the stored copy for assignment, as Numba is strict about array aliasing
-        self.next_member[:] = self.original_next_member_copy
+        self.current_gen += 1
         self.found_count = 0
 
+def make_pointbin3d(original_points, bin_widths, use_f32=False):
+    """Builds a PointBin3D_JIT from any array-likes, converting them to C-contiguous float64 first."""
+    original_points = np.ascontiguousarray(original_points, dtype=np.float64)
+    bin_widths = np.ascontiguousarray(bin_widths, dtype=np.float64)
+    return PointBin3D_JIT(original_points, bin_widths, use_f32)
+
 # --- Test Setup ---
 # (Place this after your PointBin3D_JIT class definition)
 
@@ -180,7 +661,7 @@ def run_pointbin_test():
     # 2. Initialize the JIT Class
     # ---------------------------
     point_bin = PointBin3D_JIT(original_points, bin_widths)
-    print(f"Total points: {point_bin.points.shape[0]}")
+    print(f"Total points: {point_bin.px.shape[0]}")
     print(f"Bin shape: {point_bin.bin_shape}")
 
     assert np.allclose(point_bin.origin, np.array([0.0, 0.0, 0.0]))
@@ -201,7 +682,9 @@ def run_pointbin_test():
     assert np.array_equal(np.sort(results_1), expected_1), f"Expected {expected_1}, got {results_1}"
     assert point_bin.found_count == 1, f"Expected found_count 1, got {point_bin.found_count}"
 
-    assert point_bin.first_member[1, 1, 1] == -1, "Point was not removed from bin head."
+    flat_111 = point_bin.morton_x[1] | point_bin.morton_y[1] | point_bin.morton_z[1]
+    bin_111 = slice(point_bin.bin_start[flat_111], point_bin.bin_start[flat_111 + 1])
+    assert (point_bin.visited_gen[bin_111] == point_bin.current_gen).all(), "Point was not removed from bin (1,1,1)."
 
     # 4. Search 2: Attempt to find point 2 again (should fail) and find point 0
     # --------------------------------------------------------------------------
@@ -232,6 +715,176 @@ def run_pointbin_test():
     assert np.array_equal(np.sort(results_3), expected_1), f"Reset failed. Expected {expected_1}, got {results_3}"
     print(f"Reset successful. Found Original Indices: {results_3}")
 
+    # 6. float32 storage: same searches, same results
+    # ------------------------------------------------
+    point_bin_f32 = PointBin3D_JIT(original_points, bin_widths, True)
+
+    point_bin_f32.radius_search(query_point_1, radius_1)
+    point_bin_f32.radius_search(query_point_2, radius_2)
+    results_4 = point_bin_f32.found_indices()
+
+    print("\n--- float32 Storage ---")
+    print(f"Found Original Indices: {results_4}")
+
+    assert np.array_equal(np.sort(results_4), expected_2), f"float32 mode failed. Expected {expected_2}, got {results_4}"
+
+    # 7. Batched queries: read-only, skip points already removed by radius_search
+    # -----------------------------------------------------------------------------
+    queries = np.array([query_point_1, query_point_2, [10.0, 10.0, 10.0]], dtype=np.float64)
+    radii = np.array([radius_1, radius_2, 0.1], dtype=np.float64)
+    offsets, indices = point_bin.radius_search_many(queries, radii)
+
+    print("\n--- Batched Queries ---")
+    print(f"Offsets: {offsets}, Found Original Indices: {indices}")
+
+    # Point 2 was removed by the re-run of search 1 above
+    assert np.array_equal(offsets, np.array([0, 0, 1, 2])), f"Unexpected offsets {offsets}"
+    assert np.array_equal(indices, np.array([0, 3])), f"Unexpected indices {indices}"
+    assert point_bin.found_count == 1, "radius_search_many must not remove points"
+
+    try:
+        point_bin.radius_search_many(queries[:, :2], radii)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("radius_search_many accepted (n, 2) queries")
+    try:
+        point_bin.radius_search_many(queries[0], radii)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("radius_search_many accepted 1-D queries")
+
+    # 8. Non-contiguous / non-float64 input goes through make_pointbin3d
+    # -------------------------------------------------------------------
+    point_bin_strided = make_pointbin3d(np.asfortranarray(original_points), [5, 5, 5])
+    point_bin_strided.radius_search(query_point_1, radius_1)
+    results_5 = point_bin_strided.found_indices()
+
+    assert np.array_equal(np.sort(results_5), expected_1), f"Strided input failed. Expected {expected_1}, got {results_5}"
+
+    # 9. Dense bins: full tiles, branchless compaction and removal, checked against brute force
+    # -------------------------------------------------------------------------------------------
+    rng = np.random.default_rng(0)
+    dense_points = rng.uniform(0.0, 10.0, size=(400, 3))  # ~50 points in each of the 8 bins
+    point_bin_dense = PointBin3D_JIT(dense_points, bin_widths)
+    counts = point_bin_dense.bin_start[1:] - point_bin_dense.bin_start[:-1]
+    assert counts.max() >= 8, "Dense test cloud must fill at least one full tile"
+
+    dense_queries = [(np.array([2.5, 2.5, 2.5]), 2.0), (np.array([5.0, 5.0, 5.0]), 3.0),
+                     (np.array([2.0, 3.0, 2.5]), 2.5)]
+    removed = np.zeros(dense_points.shape[0], dtype=np.bool_)
+    for query_point, radius in dense_queries:
+        point_bin_dense.radius_search(query_point, radius)
+        removed |= ((dense_points - query_point) ** 2).sum(axis=1) <= radius * radius
+    results_6 = point_bin_dense.found_indices()
+
+    print("\n--- Dense Bins ---")
+    print(f"Largest bin: {counts.max()} points, found {results_6.shape[0]}")
+
+    assert np.array_equal(np.sort(results_6), np.nonzero(removed)[0]), "Dense search does not match brute force"
+    assert (point_bin_dense.visited_gen == point_bin_dense.current_gen).sum() == removed.sum(), \
+        "Dense search removed the wrong number of points"
+
+    point_bin_dense.reset()
+    query_point, radius = dense_queries[1]
+    point_bin_dense.radius_search(query_point, radius)
+    expected_6 = np.nonzero(((dense_points - query_point) ** 2).sum(axis=1) <= radius * radius)[0]
+    results_7 = point_bin_dense.found_indices()
+    assert np.array_equal(np.sort(results_7), expected_6), "Dense search after reset does not match brute force"
+
+    # 10. Far from zero: points just inside / just outside the radius around a query at 1e7
+    # ----------------------------------------------------------------------------------------
+    query_far = np.array([1e7, 1e7, 1e7])
+    radius_far = 0.5
+    directions = rng.normal(size=(64, 3))
+    directions /= np.sqrt((directions ** 2).sum(axis=1))[:, None]
+    far_points = np.concatenate((query_far + 0.999 * radius_far * directions,
+                                 query_far + 1.001 * radius_far * directions))
+    point_bin_far = PointBin3D_JIT(far_points, np.array([1.0, 1.0, 1.0]))
+    point_bin_far.radius_search(query_far, radius_far)
+    results_8 = point_bin_far.found_indices()
+
+    print("\n--- Far From Zero ---")
+    print(f"Found {results_8.shape[0]} of 64 points inside the radius")
+
+    assert np.array_equal(np.sort(results_8), np.arange(64)), "Boundary points misclassified far from zero"
+
+    # 11. Radius of exactly one bin width whose bin box floor-rounds to 4 bins along x
+    # ----------------------------------------------------------------------------------
+    width = 0.8465194089276844
+    corner = -75.40394949807967
+    query_wide = np.array([-63.552677773092086, -74.98068979361582, -74.98068979361582])
+    wide_points = np.array([[corner, corner, corner],
+                            [-62.7061583641644, query_wide[1], query_wide[2]],  # 8.9e-16 inside the radius
+                            [corner + 20 * width, corner + 2 * width, corner + 2 * width]])
+    point_bin_wide = PointBin3D_JIT(wide_points, np.array([width, width, width]))
+    point_bin_wide.radius_search(query_wide, width)
+    results_9 = point_bin_wide.found_indices()
+    assert np.array_equal(results_9, np.array([1])), f"4-bin box missed a point. Got {results_9}"
+
+    # 12. Radii wider than a bin: the serial sweep and the parallel slab path, hits in (ix, iy, iz) order
+    # ----------------------------------------------------------------------------------------------------
+    grid_points = rng.uniform(0.0, 10.0, size=(2000, 3))
+    grid_widths = np.array([1.0, 1.0, 1.0])
+    point_bin_grid = PointBin3D_JIT(grid_points, grid_widths)
+    grid_bins = np.floor((grid_points - point_bin_grid.origin) / grid_widths).astype(np.int64)
+
+    removed = np.zeros(grid_points.shape[0], dtype=np.bool_)
+    # Bin boxes of 8x8x8 (parallel) and 4x4x4 (serial sweep)
+    for query_point, radius in ((np.array([5.0, 5.0, 5.0]), 3.2), (np.array([2.0, 7.0, 4.0]), 1.7)):
+        start = point_bin_grid.found_count
+        point_bin_grid.radius_search(query_point, radius)
+        hits = np.nonzero(~removed & (((grid_points - query_point) ** 2).sum(axis=1) <= radius * radius))[0]
+        removed[hits] = True
+        # Within a bin the counting sort keeps input order, so index order breaks ties
+        expected_7 = hits[np.lexsort((hits, grid_bins[hits, 2], grid_bins[hits, 1], grid_bins[hits, 0]))]
+        results_10 = point_bin_grid.found_indices()[start:]
+        assert np.array_equal(results_10, expected_7), f"Wide search (r={radius}) does not match brute force"
+
+    print("\n--- Wide Radii ---")
+    print(f"Found {point_bin_grid.found_count} points over two searches")
+
+    # 13. float32 boundary margin: points at 0.95r / 1.05r inside a 1000-unit cloud
+    # -------------------------------------------------------------------------------
+    query_f32 = np.array([990.0, 985.0, 995.0])
+    radius_f32 = 1.0
+    directions = rng.normal(size=(100, 3))
+    directions /= np.sqrt((directions ** 2).sum(axis=1))[:, None]
+    margin_points = np.concatenate((query_f32 + 0.95 * radius_f32 * directions,
+                                    query_f32 + 1.05 * radius_f32 * directions,
+                                    rng.uniform(0.0, 1000.0, size=(2000, 3))))
+    expected_8 = np.nonzero(((margin_points - query_f32) ** 2).sum(axis=1) <= radius_f32 * radius_f32)[0]
+    assert np.array_equal(expected_8[:100], np.arange(100)), "Margin points must all lie inside the radius"
+
+    point_bin_margin = PointBin3D_JIT(margin_points, np.array([2.0, 2.0, 2.0]), True)
+    offsets_f32, indices_f32 = point_bin_margin.radius_search_many(query_f32[None, :], np.array([radius_f32]))
+    point_bin_margin.radius_search(query_f32, radius_f32)
+    results_11 = point_bin_margin.found_indices()
+
+    print("\n--- float32 Boundary Margin ---")
+    print(f"Found {results_11.shape[0]} points, expected {expected_8.shape[0]}")
+
+    assert np.array_equal(np.sort(results_11), expected_8), "float32 mode misclassified a 5% margin point"
+    assert np.array_equal(np.sort(indices_f32), expected_8), "float32 batch misclassified a 5% margin point"
+
+    # 14. One bin holding every point: each query's scratch segment spans the whole cloud,
+    # so the batch has to be split to stay within QUERY_SCRATCH_LEN
+    # ---------------------------------------------------------------------------------------
+    crowded_points = rng.uniform(0.0, 100.0, size=(200_000, 3))
+    crowded_queries = rng.uniform(0.0, 100.0, size=(4096, 3))
+    crowded_radii = np.full(4096, 0.5)
+    point_bin_crowded = PointBin3D_JIT(crowded_points, np.array([100.0, 100.0, 100.0]))
+    offsets_crowded, indices_crowded = point_bin_crowded.radius_search_many(crowded_queries, crowded_radii)
+
+    print("\n--- One Crowded Bin ---")
+    print(f"Found {indices_crowded.shape[0]} points for {crowded_queries.shape[0]} queries")
+
+    for q in range(0, 4096, 256):
+        expected_9 = np.nonzero(((crowded_points - crowded_queries[q]) ** 2).sum(axis=1) <= 0.25)[0]
+        got_9 = np.sort(indices_crowded[offsets_crowded[q]:offsets_crowded[q + 1]])
+        assert np.array_equal(got_9, expected_9), f"Crowded-bin query {q}: expected {expected_9}, got {got_9}"
+
     print("\n*** ALL TESTS PASSED ***")
 
 # ---------------------------------------------------------------------